@@ -1,8 +1,10 @@
+import hashlib
 import shutil
 import os
+import threading
+from collections import deque
 from pathlib import Path
 from datetime import datetime
-from pydub import AudioSegment
 from rich.console import Console
 
 from microfoon.config import STORAGE_DIRECTORY
@@ -10,28 +12,164 @@ from microfoon.config import STORAGE_DIRECTORY
 console = Console()
 
 AUDIO_EXTENSIONS = {".mp3", ".wav", ".m4a", ".aac", ".flac", ".ogg", ".opus"}
+_EXT_NO_DOT = frozenset(ext[1:] for ext in AUDIO_EXTENSIONS)
 
-def find_audio_files(directory: Path):
-    """Recursively find audio files in a directory."""
-    audio_files = []
-    for root, dirs, files in os.walk(directory):
-        for file in files:
-            if file.startswith("._"):
+# Visit entries in inode order to cut seeks on spinning USB drives. Inode numbers
+# come for free from readdir on POSIX; on Windows they cost a stat and mean little.
+SORT_BY_INODE = os.name != "nt"
+
+def _read_dir(directory: str):
+    """List one directory, returning ((path, size) of audio files, subdirectory paths)."""
+    files = []
+    subdirs = []
+    try:
+        with os.scandir(directory) as it:
+            entries = list(it)
+        if SORT_BY_INODE:
+            entries.sort(key=os.DirEntry.inode)
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+                continue
+            name = entry.name
+            if name.startswith("._"):
                 continue
-            if Path(file).suffix.lower() in AUDIO_EXTENSIONS:
-                audio_files.append(Path(root) / file)
-    return audio_files
+            stem, dot, ext = name.rpartition(".")
+            if dot and stem and ext.lower() in _EXT_NO_DOT:
+                # Reuse the entry's stat (cached by scandir, free on Windows) instead of a later Path.stat()
+                try:
+                    files.append((entry.path, entry.stat().st_size))
+                except OSError:
+                    continue
+    except OSError:
+        # Match os.walk, which silently skips unreadable directories
+        pass
+    return files, subdirs
 
-def copy_and_rename(file_path: Path) -> Path:
-    """Copy audio file to storage with timestamp."""
+def _scan(directory: str):
+    """Yield (path, size) of audio files below directory, reusing scandir entries."""
+    files, subdirs = _read_dir(directory)
+    yield from files
+    for subdir in subdirs:
+        yield from _scan(subdir)
+
+def find_audio_files(directory: Path):
+    """Recursively find audio files in a directory, returning (Path, size in bytes) tuples."""
+    return [(Path(path), size) for path, size in _scan(str(directory))]
+
+def find_audio_files_parallel(directory: Path, threads: int = 32):
+    """
+    Recursively find audio files, listing directories from a pool of threads.
+    USB sticks and network volumes have a high latency per readdir, so
+    overlapping them pays off. Workers are started as folders are found,
+    up to threads, so small trees only ever use a few of them.
+    """
+    if threads <= 1:
+        return find_audio_files(directory)
+
+    audio_files, subdirs = _read_dir(str(directory))
+
+    # Directories still to list; popped LIFO so workers stay close to each other in the tree
+    pending = deque(subdirs)
+    active = 0
+    waiting = 0
+    condition = threading.Condition()
+    errors = []
+    workers = []
+
+    def spawn(count):
+        # Called with the condition held
+        for _ in range(count):
+            t = threading.Thread(target=worker, daemon=True)
+            workers.append(t)
+            t.start()
+
+    def worker():
+        nonlocal active, waiting
+        while True:
+            with condition:
+                while not pending and active and not errors:
+                    waiting += 1
+                    condition.wait()
+                    waiting -= 1
+                if not pending or errors:
+                    return
+                current = pending.pop()
+                active += 1
+            files, children = [], []
+            try:
+                files, children = _read_dir(current)
+            except BaseException as e:
+                errors.append(e)
+            finally:
+                # Always release the slot, or the other workers would wait forever
+                with condition:
+                    audio_files.extend(files)
+                    pending.extend(children)
+                    active -= 1
+                    # Grow the pool while there are more folders queued than idle workers
+                    spawn(min(threads - len(workers), len(pending) - waiting))
+                    condition.notify_all()
+
+    with condition:
+        spawn(min(threads, len(pending)))
+    # Workers may start more workers, but only before they exit, so this sees them all
+    joined = 0
+    while joined < len(workers):
+        workers[joined].join()
+        joined += 1
+    if errors:
+        raise errors[0]
+
+    # Worker scheduling makes the discovery order arbitrary
+    audio_files.sort()
+    return [(Path(path), size) for path, size in audio_files]
+
+def _storage_destination(file_path: Path) -> Path:
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     new_filename = f"{timestamp}_{file_path.name}"
-    destination = STORAGE_DIRECTORY / new_filename
+    return STORAGE_DIRECTORY / new_filename
+
+def _copy_times(source: Path, destination: Path):
+    source_stat = os.stat(source)
+    os.utime(destination, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns))
+
+def copy_and_rename(file_path: Path) -> Path:
+    """Copy audio file to storage with timestamp."""
+    destination = _storage_destination(file_path)
     
     console.log(f"Copying {file_path} to {destination}...")
-    shutil.copy2(file_path, destination)
+    # copyfile keeps the kernel fast path (sendfile/fcopyfile) but skips copy2's
+    # permission, flag and xattr syscalls; only the timestamps are worth keeping
+    shutil.copyfile(file_path, destination)
+    _copy_times(file_path, destination)
     return destination
 
+def copy_and_hash(source: Path, destination: Path, algo: str = "sha256", bufsize: int = 4 * 1024 * 1024) -> str:
+    """Copy a file and hash its bytes in the same sequential read, returning the hex digest."""
+    digest = hashlib.new(algo)
+    with open(source, "rb") as src, open(destination, "wb") as dst:
+        while buf := src.read(bufsize):
+            dst.write(buf)
+            digest.update(buf)
+    _copy_times(source, destination)
+    return digest.hexdigest()
+
+def copy_and_rename_hashed(file_path: Path) -> tuple[Path, str]:
+    """Copy audio file to storage with timestamp, returning the new path and its SHA-256 digest."""
+    destination = _storage_destination(file_path)
+    
+    console.log(f"Copying {file_path} to {destination}...")
+    return destination, copy_and_hash(file_path, destination)
+
+def list_stored_files(directory: Path = STORAGE_DIRECTORY) -> set[str]:
+    """Names of the files in the storage directory, read in one scandir pass instead of a stat per lookup."""
+    try:
+        with os.scandir(directory) as it:
+            return {entry.name for entry in it if entry.is_file()}
+    except OSError:
+        return set()
+
 def get_audio_duration(file_path: Path) -> float:
     """Get the duration of an audio file in seconds using ffprobe."""
     import subprocess
@@ -83,9 +221,10 @@ def compress_audio(input_path: Path, output_path: Path = None):
         import subprocess
         cmd = [
             "ffmpeg", "-y", "-i", str(input_path),
-            "-c:a", "libmp3lame", "-b:a", "64k", str(output_path)
+            "-vn", "-c:a", "libmp3lame", "-b:a", "64k", str(output_path)
         ]
-        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        # ffmpeg streams the samples itself; keep it away from our terminal stdin
+        result = subprocess.run(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
         
         if result.returncode != 0:
             console.log(f"[bold red]Compression failed (ffmpeg error):[/bold red]\n{result.stderr}")
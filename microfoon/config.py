@@ -1,9 +1,20 @@
 import os
 from pathlib import Path
-from dotenv import load_dotenv
 
-# Load environment variables from .env file
-load_dotenv()
+ENV_VARS = (
+    "GEMINI_API_KEY",
+    "WATCH_DIRECTORY",
+    "STORAGE_DIRECTORY",
+    "OBSIDIAN_VAULT_PATH",
+    "TARGET_VOLUME_NAME",
+    "GEMINI_CONCURRENCY",
+    "GEMINI_REQUESTS_PER_MINUTE",
+)
+
+# Load environment variables from .env file, unless the environment already provides all of them
+if not all(name in os.environ for name in ENV_VARS):
+    from dotenv import load_dotenv
+    load_dotenv()
 
 # Base directory
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -15,6 +26,8 @@ STORAGE_DIRECTORY = Path(os.getenv("STORAGE_DIRECTORY", "./recordings"))
 OBSIDIAN_VAULT_PATH = Path(os.getenv("OBSIDIAN_VAULT_PATH", "./obsidian_vault"))
 TARGET_VOLUME_NAME = os.getenv("TARGET_VOLUME_NAME", "VOICE")
 DATABASE_URL = f"sqlite:///{BASE_DIR}/microfoon.db"
+GEMINI_CONCURRENCY = int(os.getenv("GEMINI_CONCURRENCY", "4"))
+GEMINI_REQUESTS_PER_MINUTE = float(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "15"))
 
 # Prompts
 def load_prompt(filename, default):
@@ -1,6 +1,8 @@
+import sqlite3
+import threading
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Enum
+from sqlalchemy import create_engine, event, Column, Index, Integer, String, Text, DateTime, Enum
 from sqlalchemy.orm import declarative_base, sessionmaker
 import enum
 
@@ -10,6 +12,29 @@ Base = declarative_base()
 engine = create_engine(DATABASE_URL, echo=False)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# WAL with synchronous=NORMAL avoids an fsync per commit; the rest keeps hot pages in memory
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA mmap_size=268435456",
+)
+
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+def open_db(path) -> sqlite3.Connection:
+    """Opens a plain sqlite3 connection with the same pragmas as the engine, for raw-SQL scripts."""
+    conn = sqlite3.connect(path)
+    for pragma in SQLITE_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
 class ProcessingStatus(str, enum.Enum):
     PENDING = "pending"
     PROCESSING = "processing"
@@ -19,6 +44,10 @@ class ProcessingStatus(str, enum.Enum):
 
 class Recording(Base):
     __tablename__ = "recordings"
+    # Covers scripts/cleanup_db.py's filename+date duplicate query without reading transcript pages
+    __table_args__ = (
+        Index("idx_recordings_origname_stored", "original_filename", "stored_filename"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     original_filename = Column(String, index=True)
@@ -40,6 +69,42 @@ class Recording(Base):
     def __repr__(self):
         return f"<Recording(id={self.id}, title='{self.title}', status='{self.status}')>"
 
+class GeminiCache(Base):
+    """Gemini results keyed by a digest of the audio content and the request."""
+    __tablename__ = "gemini_cache"
+
+    digest = Column(String, primary_key=True)
+    result_json = Column(Text)
+    created_at = Column(DateTime, default=datetime.now)
+
+# Set once gemini_cache is known to exist in this process; the lock covers concurrent Gemini workers
+_cache_table_ready = False
+_cache_table_lock = threading.Lock()
+
+def _ensure_cache_table():
+    """Creates gemini_cache on first use, so only processes that hit the cache run the DDL."""
+    global _cache_table_ready
+    if _cache_table_ready:
+        return
+    with _cache_table_lock:
+        if not _cache_table_ready:
+            GeminiCache.__table__.create(bind=engine, checkfirst=True)
+            _cache_table_ready = True
+
+def get_cached_result(digest: str) -> Optional[str]:
+    """Returns the cached result JSON for a digest, or None on a miss."""
+    _ensure_cache_table()
+    with SessionLocal() as db:
+        entry = db.get(GeminiCache, digest)
+        return entry.result_json if entry else None
+
+def store_cached_result(digest: str, result_json: str):
+    """Inserts or replaces the cached result JSON for a digest."""
+    _ensure_cache_table()
+    with SessionLocal() as db:
+        db.merge(GeminiCache(digest=digest, result_json=result_json))
+        db.commit()
+
 def init_db():
     Base.metadata.create_all(bind=engine)
 
@@ -1,3 +1,4 @@
+import re
 from pathlib import Path
 from datetime import datetime
 from rich.console import Console
@@ -7,6 +8,13 @@ from microfoon.database import Recording, ProcessingStatus
 
 console = Console()
 
+# Everything str.isalnum() rejects except space, "-" and "_"; \w is Unicode-aware like isalnum()
+_UNSAFE_TITLE_CHARS = re.compile(r"[^\w \-]")
+
+def safe_title(title: str) -> str:
+    """Strips characters that are unsafe in a note filename."""
+    return _UNSAFE_TITLE_CHARS.sub("", title).strip()
+
 class ObsidianExporter:
     def __init__(self):
         if not OBSIDIAN_VAULT_PATH.exists():
@@ -16,8 +24,7 @@ class ObsidianExporter:
 
     def export(self, recording: Recording) -> Path:
         """Exports a recording to an Obsidian markdown file."""
-        safe_title = "".join(c for c in recording.title if c.isalnum() or c in (' ', '-', '_')).strip()
-        filename = f"{safe_title}.md"
+        filename = f"{safe_title(recording.title)}.md"
         file_path = self.vault_path / filename
 
         reprocessed_tag = ""
@@ -1,26 +1,170 @@
-import json
+import hashlib
+import random
+import threading
 import time
-import re
-from google import genai
+from dataclasses import asdict, dataclass
+from typing import Optional
+import orjson
 from rich.console import Console
 
 from microfoon.config import GEMINI_API_KEY, PROMPT_CLEANUP, PROMPT_TITLE
 
 console = Console()
 
+# C0 and C1 control characters, deleted in one C-level pass by str.translate
+_CONTROL_CHARS = dict.fromkeys([*range(0x00, 0x20), *range(0x7f, 0xa0)])
+
+def parse_json_response(text):
+    """
+    Parses a JSON response from Gemini.
+    Gemini may occasionally return raw control chars inside JSON strings;
+    on a decode error those chars are stripped and parsing is retried once.
+    """
+    try:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        return orjson.loads(text.translate(_CONTROL_CHARS))
+
+@dataclass
+class AudioResult:
+    """Parsed Gemini output for a recording; fields Gemini omits are None."""
+    __slots__ = ("transcript", "cleanup", "title", "language")
+
+    transcript: Optional[str]
+    cleanup: Optional[str]
+    title: Optional[str]
+    language: Optional[str]
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            transcript=data.get("transcript"),
+            cleanup=data.get("cleanup"),
+            title=data.get("title"),
+            language=data.get("language"),
+        )
+
+    def is_complete(self):
+        """True when transcript, cleanup and title are all non-empty strings."""
+        return all(isinstance(value, str) and value for value in (self.transcript, self.cleanup, self.title))
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """Hashes a file in 1 MB chunks and returns the hex digest."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class RateLimiter:
+    """Spaces out request starts, from any thread, at least 60/per_minute seconds apart."""
+
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+
+    def wait(self):
+        """Blocks until the caller's turn to start a request."""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
 class GeminiProcessor:
-    def __init__(self):
+    def __init__(self, requests_per_minute=None):
         if not GEMINI_API_KEY:
             raise ValueError("GEMINI_API_KEY is not set in environment variables.")
+        # Imported here: the SDK pulls in a heavy HTTP/protobuf stack that most entry points never use
+        from google import genai
         self.client = genai.Client(api_key=GEMINI_API_KEY)
         # using flash for speed and cost, supports audio input
         self.model_name = "gemini-2.0-flash"
+        # Optional cap on request starts; cached results never wait for it
+        self._rate_limiter = RateLimiter(requests_per_minute) if requests_per_minute else None
+        # The audio prompt only depends on the configured prompts, so build it once
+        self._audio_prompt = f"""
+        Please process the attached audio file.
+        
+        STEP 1: Transcribe the audio verbatim. Detect the language (English or Dutch) automatically based on the spoken words.
+        
+        STEP 2: Execute the following tasks STRICTLY in the detected language from Step 1.
+        - {PROMPT_CLEANUP}
+        - {PROMPT_TITLE}
+
+        If the audio is short or ambiguous, prefer Dutch if there is any doubt.
+
+        Output the result strictly in JSON format with the following keys:
+        - "transcript": The full transcription text.
+        - "cleanup": The cleaned up text.
+        - "title": The generated title.
+        - "language": The detected language code (e.g., "en", "nl").
+        """
 
-    def process_audio(self, audio_path, retry=True):
+    def _wait_for_file(self, audio_file):
+        """
+        Polls an uploaded file until Gemini has finished processing it.
+        Short clips are usually ready almost at once, so polling starts fast
+        and backs off exponentially (with jitter) up to a couple of seconds.
+        """
+        delay = 0.25
+        while audio_file.state.name == "PROCESSING":
+            time.sleep(delay * random.uniform(0.8, 1.2))
+            delay = min(delay * 1.7, 2.0)
+            audio_file = self.client.files.get(name=audio_file.name)
+        return audio_file
+
+    def _wait_for_slot(self):
+        if self._rate_limiter is not None:
+            self._rate_limiter.wait()
+
+    def _cache_key(self, content_digest):
+        """Combines the audio digest with everything else that shapes the answer."""
+        request = "\0".join((self.model_name, self._audio_prompt, content_digest))
+        return hashlib.sha256(request.encode("utf-8")).hexdigest()
+
+    def _load_cached(self, cache_key):
+        # Imported here so that importing this module does not pull in SQLAlchemy
+        from microfoon.database import get_cached_result
+        try:
+            cached = get_cached_result(cache_key)
+        except Exception as e:
+            console.log(f"[yellow]Gemini cache lookup failed: {e}[/yellow]")
+            return None
+        if not cached:
+            return None
+        result = AudioResult.from_dict(orjson.loads(cached))
+        # Incomplete answers cached before they were filtered out are asked for again
+        return result if result.is_complete() else None
+
+    def _store_cached(self, cache_key, result):
+        from microfoon.database import store_cached_result
+        try:
+            store_cached_result(cache_key, orjson.dumps(asdict(result)).decode("utf-8"))
+        except Exception as e:
+            console.log(f"[yellow]Could not cache Gemini result: {e}[/yellow]")
+
+    def process_audio(self, audio_path, retry=True, content_digest=None, use_cache=True):
         """
         Uploads audio to Gemini and requests transcription, summary, and title in JSON format.
         Retries on failure if retry=True with exponential backoff to handle rate limits (429).
+        Results are cached by audio content, so byte-identical files are only processed once;
+        pass the file's SHA-256 as content_digest when it is already known to skip rehashing.
+        With use_cache=False the cached result is ignored and replaced by the fresh one.
         """
+        try:
+            cache_key = self._cache_key(content_digest or file_sha256(audio_path))
+        except OSError as e:
+            console.log(f"[yellow]Could not hash {audio_path}, skipping cache: {e}[/yellow]")
+            cache_key = None
+        cached = self._load_cached(cache_key) if cache_key and use_cache else None
+        if cached is not None:
+            console.log(f"[green]Using cached Gemini result for {audio_path}[/green]")
+            return cached
+
+        self._wait_for_slot()
         max_attempts = 5 if retry else 1
         base_retry_delay = 15
         
@@ -37,36 +181,16 @@ class GeminiProcessor:
                     audio_file = self.client.files.upload(file=str(audio_path))
                 
                 # Wait for processing state to be ACTIVE
-                while audio_file.state.name == "PROCESSING":
-                    time.sleep(10)
-                    audio_file = self.client.files.get(name=audio_file.name)
+                audio_file = self._wait_for_file(audio_file)
 
                 if audio_file.state.name == "FAILED":
                     raise Exception("Audio file processing failed by Gemini.")
 
                 console.log("Audio ready. Generating content...")
-                
-                prompt = f"""
-                Please process the attached audio file.
-                
-                STEP 1: Transcribe the audio verbatim. Detect the language (English or Dutch) automatically based on the spoken words.
-                
-                STEP 2: Execute the following tasks STRICTLY in the detected language from Step 1.
-                - {PROMPT_CLEANUP}
-                - {PROMPT_TITLE}
-
-                If the audio is short or ambiguous, prefer Dutch if there is any doubt.
-
-                Output the result strictly in JSON format with the following keys:
-                - "transcript": The full transcription text.
-                - "cleanup": The cleaned up text.
-                - "title": The generated title.
-                - "language": The detected language code (e.g., "en", "nl").
-                """
 
                 response = self.client.models.generate_content(
                     model=self.model_name,
-                    contents=[audio_file, prompt],
+                    contents=[audio_file, self._audio_prompt],
                     config={"response_mime_type": "application/json"}
                 )
                 
@@ -77,13 +201,10 @@ class GeminiProcessor:
                     pass
                 audio_file = None
 
-                try:
-                    result = json.loads(response.text)
-                except json.JSONDecodeError:
-                    # Gemini may occasionally return raw control chars inside JSON strings.
-                    # Strip those chars and retry parsing once.
-                    cleaned_text = re.sub(r"[\x00-\x1f\x7f-\x9f]", "", response.text)
-                    result = json.loads(cleaned_text)
+                result = AudioResult.from_dict(parse_json_response(response.text))
+                # Only complete answers are cached; an incomplete one fails the recording and must be retried
+                if cache_key and result.is_complete():
+                    self._store_cached(cache_key, result)
                 if attempt > 1:
                     console.log(f"[bold green]Retry successful![/bold green]")
                 return result
@@ -110,6 +231,7 @@ class GeminiProcessor:
         Uses an existing transcript to generate a summary and title.
         Avoids audio upload and re-transcription.
         """
+        self._wait_for_slot()
         max_attempts = 5 if retry else 1
         base_retry_delay = 15
         
@@ -142,11 +264,7 @@ class GeminiProcessor:
                     config={"response_mime_type": "application/json"}
                 )
                 
-                try:
-                    result = json.loads(response.text)
-                except json.JSONDecodeError:
-                    cleaned_text = re.sub(r"[\x00-\x1f\x7f-\x9f]", "", response.text)
-                    result = json.loads(cleaned_text)
+                result = AudioResult.from_dict(parse_json_response(response.text))
                 
                 if attempt > 1:
                     console.log(f"[bold green]Retry successful![/bold green]")
@@ -169,6 +287,7 @@ class GeminiProcessor:
         """
         Uploads an audio chunk and requests ONLY the verbatim transcription.
         """
+        self._wait_for_slot()
         max_attempts = 5 if retry else 1
         base_retry_delay = 15
         
@@ -184,9 +303,7 @@ class GeminiProcessor:
                 if audio_file is None:
                     audio_file = self.client.files.upload(file=str(audio_path))
                 
-                while audio_file.state.name == "PROCESSING":
-                    time.sleep(10)
-                    audio_file = self.client.files.get(name=audio_file.name)
+                audio_file = self._wait_for_file(audio_file)
 
                 if audio_file.state.name == "FAILED":
                     raise Exception("Audio file processing failed by Gemini.")
@@ -210,11 +327,7 @@ class GeminiProcessor:
                     pass
                 audio_file = None
 
-                try:
-                    result = json.loads(response.text)
-                except json.JSONDecodeError:
-                    cleaned_text = re.sub(r"[\x00-\x1f\x7f-\x9f]", "", response.text)
-                    result = json.loads(cleaned_text)
+                result = parse_json_response(response.text)
                 
                 if attempt > 1:
                     console.log(f"[bold green]Retry successful![/bold green]")
@@ -254,6 +367,6 @@ class GeminiProcessor:
         
         result = self.process_transcript(combined_transcript, retry)
         if result:
-            result["transcript"] = combined_transcript
+            result.transcript = combined_transcript
             return result
         return None
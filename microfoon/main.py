@@ -1,20 +1,85 @@
+import asyncio
 import time
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from rich.console import Console
 from rich.prompt import Confirm
-from rich.table import Table
 from rich.panel import Panel
 
 from microfoon.database import init_db, get_db, Recording, ProcessingStatus
 from microfoon.usb_monitor import USBMonitor
-from microfoon.audio import find_audio_files, copy_and_rename, compress_audio, get_audio_duration, chunk_audio
+from microfoon.audio import find_audio_files_parallel, copy_and_rename_hashed, compress_audio, get_audio_duration, chunk_audio
 from microfoon.intelligence import GeminiProcessor
 from microfoon.exporter import ObsidianExporter
-from microfoon.config import STORAGE_DIRECTORY, TARGET_VOLUME_NAME
+from microfoon.config import STORAGE_DIRECTORY, TARGET_VOLUME_NAME, GEMINI_CONCURRENCY
 
 console = Console()
 
+def analyze_stored_audio(processor: GeminiProcessor, stored_path: Path, content_digest: str = None):
+    """Runs Gemini on a stored file, segmenting recordings longer than 10 minutes."""
+    duration = get_audio_duration(stored_path)
+    if duration <= 600:
+        return processor.process_audio(stored_path, content_digest=content_digest)
+
+    console.print(f"[yellow]Audio duration ({duration/60:.1f}m) exceeds 10 minutes. Segmenting for robust processing...[/yellow]")
+    chunks = chunk_audio(stored_path, 600)
+    try:
+        return processor.process_large_audio(chunks)
+    finally:
+        # Cleanup partial mp3 chunks
+        if len(chunks) > 1:
+            for chunk in chunks:
+                if chunk != stored_path and chunk.exists():
+                    try:
+                        chunk.unlink()
+                    except:
+                        pass
+
+async def process_recordings(processor: GeminiProcessor, exporter: ObsidianExporter, db_session, recordings):
+    """
+    Processes (recording, stored_path, content_digest) tuples concurrently.
+    Gemini calls run in worker threads, at most GEMINI_CONCURRENCY at a time;
+    database and export work stays on the event loop thread.
+    """
+    semaphore = asyncio.Semaphore(GEMINI_CONCURRENCY)
+
+    async def process_one(recording, stored_path, content_digest):
+        try:
+            async with semaphore:
+                result = await asyncio.to_thread(analyze_stored_audio, processor, stored_path, content_digest)
+            
+            if result:
+                recording.transcript = result.transcript
+                recording.summary = result.cleanup
+                recording.title = result.title
+                recording.status = ProcessingStatus.COMPLETED
+                
+                console.print(f"\n[bold green]Done:[/bold green] {recording.original_filename}")
+                console.print(f"[bold]Title:[/bold] {recording.title}")
+                console.print(f"[bold]Summary:[/bold] {recording.summary[:200]}...")
+
+                # Export to Obsidian
+                obsidian_path = exporter.export(recording)
+                if obsidian_path:
+                    recording.obsidian_path = str(obsidian_path)
+                    recording.status = ProcessingStatus.EXPORTED
+            else:
+                 recording.status = ProcessingStatus.FAILED
+                 recording.error_message = "Gemini processing returned no result"
+
+        except Exception as e:
+            console.print(f"[bold red]Error processing {recording.original_filename}:[/bold red] {e}")
+            recording.status = ProcessingStatus.FAILED
+            recording.error_message = str(e)
+        
+        db_session.commit()
+
+    await asyncio.gather(*(
+        process_one(recording, stored_path, content_digest)
+        for recording, stored_path, content_digest in recordings
+    ))
+
 def process_usb_drive(drive_path: Path):
     """
     Handles the workflow when a USB drive is detected.
@@ -22,18 +87,19 @@ def process_usb_drive(drive_path: Path):
     console.print(Panel(f"[bold blue]USB Drive Detected:[/bold blue] {drive_path}"))
 
     # 1. Find Audio Files
-    audio_files = find_audio_files(drive_path)
+    audio_files = find_audio_files_parallel(drive_path)
     if not audio_files:
         console.print("[yellow]No audio files found on this drive.[/yellow]")
         return
 
     # 2. Show files and ask to start
+    from rich.table import Table
     table = Table(title="Found Audio Files")
     table.add_column("Filename", style="cyan")
     table.add_column("Size", style="magenta")
     
-    for file in audio_files:
-        size_mb = file.stat().st_size / (1024 * 1024)
+    for file, size_bytes in audio_files:
+        size_mb = size_bytes / (1024 * 1024)
         table.add_row(file.name, f"{size_mb:.2f} MB")
     
     console.print(table)
@@ -47,69 +113,40 @@ def process_usb_drive(drive_path: Path):
     processor = GeminiProcessor()
     exporter = ObsidianExporter()
 
-    # 3. Process each file
+    # 3. Copy each file and register it
     processed_files = []
+    recordings = []
     
-    for file_path in audio_files:
-        console.print(f"\n[bold green]Processing:[/bold green] {file_path.name}")
-        
-        # Copy to storage
-        stored_path = copy_and_rename(file_path)
-        
-        # Create DB record
-        recording = Recording(
-            original_filename=file_path.name,
-            stored_filename=stored_path.name,
-            source_path=str(file_path),
-            status=ProcessingStatus.PROCESSING
-        )
-        db_session.add(recording)
-        db_session.commit()
-
-        # Transcribe & Summarize via Gemini
-        try:
-            duration = get_audio_duration(stored_path)
-            if duration > 600:
-                console.print(f"[yellow]Audio duration ({duration/60:.1f}m) exceeds 10 minutes. Segmenting for robust processing...[/yellow]")
-                chunks = chunk_audio(stored_path, 600)
-                result = processor.process_large_audio(chunks)
-                
-                # Cleanup partial mp3 chunks
-                if len(chunks) > 1:
-                    for chunk in chunks:
-                        if chunk != stored_path and chunk.exists():
-                            try:
-                                chunk.unlink()
-                            except:
-                                pass
-            else:
-                result = processor.process_audio(stored_path)
+    try:
+        for file_path, _ in audio_files:
+            console.print(f"\n[bold green]Processing:[/bold green] {file_path.name}")
             
-            if result:
-                recording.transcript = result.get("transcript")
-                recording.summary = result.get("cleanup")
-                recording.title = result.get("title")
-                recording.status = ProcessingStatus.COMPLETED
-                
-                console.print(f"[bold]Title:[/bold] {recording.title}")
-                console.print(f"[bold]Summary:[/bold] {recording.summary[:200]}...")
-
-                # Export to Obsidian
-                obsidian_path = exporter.export(recording)
-                if obsidian_path:
-                    recording.obsidian_path = str(obsidian_path)
-                    recording.status = ProcessingStatus.EXPORTED
-            else:
-                 recording.status = ProcessingStatus.FAILED
-                 recording.error_message = "Gemini processing returned no result"
-
-        except Exception as e:
-            console.print(f"[bold red]Error processing {file_path.name}:[/bold red] {e}")
-            recording.status = ProcessingStatus.FAILED
-            recording.error_message = str(e)
-        
+            # Copy to storage, hashing on the way for the Gemini result cache
+            try:
+                stored_path, content_digest = copy_and_rename_hashed(file_path)
+            except Exception as e:
+                # Skip this file; the ones copied so far are still registered and processed
+                console.print(f"[bold red]Failed to copy {file_path.name}:[/bold red] {e}")
+                continue
+            
+            # Create DB record
+            recording = Recording(
+                original_filename=file_path.name,
+                stored_filename=stored_path.name,
+                source_path=str(file_path),
+                status=ProcessingStatus.PROCESSING
+            )
+            db_session.add(recording)
+            recordings.append((recording, stored_path, content_digest))
+            processed_files.append((file_path, stored_path))
+
+        # Register the whole drive in one transaction instead of one per file
         db_session.commit()
-        processed_files.append((file_path, stored_path))
+
+        # Transcribe & Summarize via Gemini, overlapping the network round-trips
+        asyncio.run(process_recordings(processor, exporter, db_session, recordings))
+    finally:
+        db_session.close()
 
     # 4. Post-processing (Delete / Compress)
     console.print(Panel("[bold blue]Post-Processing[/bold blue]"))
@@ -123,8 +160,10 @@ def process_usb_drive(drive_path: Path):
                  console.print(f"[bold red]Failed to delete {original}:[/bold red] {e}")
 
     if Confirm.ask("Do you want to compress the stored audio files to low-quality MP3?"):
-         for _, stored in processed_files:
-             compressed_path = compress_audio(stored)
+         # Each compression runs in its own ffmpeg process, so threads are enough to use every core
+         with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+             compressed_paths = list(executor.map(compress_audio, [stored for _, stored in processed_files]))
+         for compressed_path in compressed_paths:
              if compressed_path:
                  console.print(f"[green]Compressed:[/green] {compressed_path}")
                  # Option: Delete original heavy wav? 
@@ -41,10 +41,11 @@ class MicrofoonService:
         if not self.current_drive or not self.current_drive.exists():
             return []
         
-        self.found_files = find_audio_files(self.current_drive)
+        audio_files = find_audio_files(self.current_drive)
+        self.found_files = [f for f, _ in audio_files]
         result = []
-        for f in self.found_files:
-            size_mb = f.stat().st_size / (1024 * 1024)
+        for f, size_bytes in audio_files:
+            size_mb = size_bytes / (1024 * 1024)
             result.append({
                 "filename": f.name,
                 "path": str(f),
@@ -83,9 +84,9 @@ class MicrofoonService:
             result = self.processor.process_audio(stored_path)
             
             if result:
-                recording.transcript = result.get("transcript")
-                recording.summary = result.get("summary")
-                recording.title = result.get("title")
+                recording.transcript = result.transcript
+                recording.summary = result.cleanup
+                recording.title = result.title
                 recording.status = ProcessingStatus.COMPLETED
                 
                 # 4. Export
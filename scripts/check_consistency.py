@@ -1,33 +1,47 @@
+import mmap
+import re
 import sys
 from pathlib import Path
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import select
 
 # Add project root to path
 sys.path.append(str(Path(__file__).resolve().parent.parent))
 
-from microfoon.database import Recording
-from microfoon.config import DATABASE_URL, OBSIDIAN_VAULT_PATH
+from microfoon.database import SessionLocal, Recording
+from microfoon.config import OBSIDIAN_VAULT_PATH
+from microfoon.exporter import safe_title
+
+# Phrases that betray a third-person summary, matched in a single pass
+THIRD_PERSON_PATTERN = re.compile("the speaker|he mentions|she mentions")
+
+def file_contains(file_path, needle: bytes) -> bool:
+    """Searches a file for needle through mmap, without reading or decoding it into memory."""
+    if not needle:
+        return True
+    with open(file_path, "rb") as f:
+        # mmap cannot map an empty file
+        if f.seek(0, 2) == 0:
+            return False
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return mm.find(needle) != -1
 
 def check_consistency():
-    engine = create_engine(DATABASE_URL)
-    Session = sessionmaker(bind=engine)
-    session = Session()
+    session = SessionLocal()
 
-    recordings = session.query(Recording).all()
+    # Only recordings with a summary get exported; fetch just the columns we compare
+    recordings = session.execute(
+        select(Recording.title, Recording.summary)
+        .where(Recording.summary.isnot(None), Recording.summary != "")
+    ).all()
     
     issues_found = 0
     
     print(f"Checking {len(recordings)} recordings...")
     
-    for rec in recordings:
-        if not rec.summary:
-            continue
-            
+    for title, summary in recordings:
         # Construct expected Obsidian path
         # Logic from exporter.py: safe_title + .md
-        safe_title = "".join(c for c in rec.title if c.isalnum() or c in (' ', '-', '_')).strip()
-        filename = f"{safe_title}.md"
+        filename = f"{safe_title(title)}.md"
         file_path = OBSIDIAN_VAULT_PATH / filename
         
         if not file_path.exists():
@@ -36,22 +50,19 @@ def check_consistency():
             continue
             
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                content = f.read()
-                
             # Check if the DB summary is present in the file
-            # content should contain "## Note\n{rec.summary}"
-            # We'll just check if rec.summary is IN content
+            # content should contain "## Note\n{summary}"
+            # We'll just check if summary is IN content
             
-            if rec.summary.strip() not in content:
+            stripped_summary = summary.strip()
+            if not file_contains(file_path, stripped_summary.encode("utf-8")):
                 print(f"[MISMATCH] {filename}")
-                print(f"  DB Start: {rec.summary.strip()[:50]}...")
+                print(f"  DB Start: {stripped_summary[:50]}...")
                 print(f"  File Content does not match DB.")
                 issues_found += 1
             else:
                  # Optional: Check for third person in DB content
-                 lower_summary = rec.summary.lower()
-                 if "the speaker" in lower_summary or "he mentions" in lower_summary or "she mentions" in lower_summary:
+                 if THIRD_PERSON_PATTERN.search(summary.lower()):
                      print(f"[THIRD PERSON DETECTED IN DB] {filename}")
                      issues_found += 1
 
@@ -8,9 +8,8 @@ Duplicates are identified by:
 """
 import os
 import sys
-import sqlite3
 import argparse
-import re
+from itertools import groupby
 from pathlib import Path
 from collections import defaultdict
 from difflib import SequenceMatcher
@@ -22,6 +21,8 @@ from rich.console import Console
 from rich.table import Table
 from rich.progress import track
 
+from microfoon.database import open_db
+
 console = Console()
 
 DB_PATH = Path(__file__).parent.parent / "microfoon.db"
@@ -31,15 +32,38 @@ RECORDINGS_DIR = Path(__file__).parent.parent / "recordings"
 TRANSCRIPT_SIMILARITY_THRESHOLD = 0.85  # 85% similar
 FILE_SIZE_TOLERANCE = 0.10  # Within 10%
 
+# Keeps each "id IN (...)" list well below SQLite's bound-parameter limit
+ID_BATCH_SIZE = 500
+
+
+# {filename: size} for every file in RECORDINGS_DIR, filled by load_size_index()
+SIZE_INDEX = None
+
+
+def _chunks(items, size):
+    """Yield consecutive slices of at most size items."""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def load_size_index():
+    """Read the size of every stored recording in a single directory scan."""
+    global SIZE_INDEX
+    try:
+        with os.scandir(RECORDINGS_DIR) as it:
+            SIZE_INDEX = {entry.name: entry.stat().st_size for entry in it if entry.is_file()}
+    except FileNotFoundError:
+        SIZE_INDEX = {}
+    return SIZE_INDEX
+
 
 def get_file_size(stored_filename):
     """Get file size in bytes, return None if file doesn't exist."""
     if not stored_filename:
         return None
-    file_path = RECORDINGS_DIR / stored_filename
-    if file_path.exists():
-        return file_path.stat().st_size
-    return None
+    if SIZE_INDEX is None:
+        load_size_index()
+    return SIZE_INDEX.get(stored_filename)
 
 
 def text_similarity(text1, text2):
@@ -49,6 +73,19 @@ def text_similarity(text1, text2):
     return SequenceMatcher(None, text1.strip(), text2.strip()).ratio()
 
 
+def texts_similar(text1, text2, threshold):
+    """Check if two stripped texts reach the similarity threshold.
+    
+    ratio() can never exceed quick_ratio(), so that cheaper bound rules out pairs before
+    the quadratic comparison runs. The length bound 2*min(len)/(len1+len2) is even
+    cheaper; the similarity pass checks it inline before calling this.
+    """
+    if not text1 or not text2:
+        return False
+    matcher = SequenceMatcher(None, text1, text2)
+    return matcher.quick_ratio() >= threshold and matcher.ratio() >= threshold
+
+
 def file_size_similar(size1, size2, tolerance=FILE_SIZE_TOLERANCE):
     """Check if two file sizes are similar within tolerance."""
     if size1 is None or size2 is None:
@@ -59,164 +96,247 @@ def file_size_similar(size1, size2, tolerance=FILE_SIZE_TOLERANCE):
     return ratio >= (1 - tolerance)
 
 
-def extract_date_from_stored_filename(stored_filename):
+def fetch_filename_date_groups(conn):
     """
-    Extract date from stored filename.
-    Format: YYYYMMDD_HHMMSS_originalname.ext
-    Returns: YYYYMMDD string or None if not found
+    Let SQLite find the records whose (original_filename, date) occurs more than
+    once and return them as (filename, date, [ids]) tuples.
+    The date is the YYYYMMDD of a stored filename that starts with YYYYMMDD_HHMMSS_
+    and NULL otherwise. macOS metadata files are ignored.
     """
-    if not stored_filename:
-        return None
-    # Match pattern like: 20260215_224026_REC001.WAV
-    match = re.match(r'(\d{8})_\d{6}_', stored_filename)
-    if match:
-        return match.group(1)
-    return None
+    cursor = conn.cursor()
+    # A window count flags the duplicate rows, so only their ids come back to Python
+    cursor.execute("""
+        WITH keyed AS (
+            SELECT id,
+                   upper(original_filename) AS filename,
+                   CASE WHEN stored_filename GLOB
+                             '[0-9][0-9][0-9][0-9][0-9][0-9][0-9][0-9]_[0-9][0-9][0-9][0-9][0-9][0-9]_*'
+                        THEN substr(stored_filename, 1, 8) END AS date
+            FROM recordings
+            WHERE original_filename != '' AND substr(original_filename, 1, 2) != '._'
+        )
+        SELECT filename, date, id
+        FROM (
+            SELECT filename, date, id,
+                   COUNT(*) OVER (PARTITION BY filename, date) AS copies
+            FROM keyed
+        )
+        WHERE copies > 1
+        ORDER BY filename, date, id
+    """)
+    return [
+        (filename, date, [row[2] for row in rows])
+        for (filename, date), rows in groupby(cursor.fetchall(), key=lambda row: (row[0], row[1]))
+    ]
+
+
+def fetch_transcripts(conn, ids):
+    """Return {id: transcript} for the given record ids, a batch of ids per query."""
+    cursor = conn.cursor()
+    transcripts = {}
+    for chunk in _chunks(ids, ID_BATCH_SIZE):
+        placeholders = ','.join('?' * len(chunk))
+        cursor.execute(f"SELECT id, transcript FROM recordings WHERE id IN ({placeholders})", chunk)
+        transcripts.update(cursor.fetchall())
+    return transcripts
 
 
-def find_duplicate_groups(records):
+def find_duplicate_groups(records, filename_date_groups):
     """
     Find groups of duplicate records using:
     1. FIRST: Group by (original_filename + date) - strongest indicator
        Since each USB import session restarts REC numbering, the combination is unique
     2. THEN: Apply exact matching on remaining records
     3. FINALLY: Apply similarity matching on remaining records
-    Returns list of groups, where each group is a list of similar records.
+    filename_date_groups comes from fetch_filename_date_groups() and may
+    mention records that are not in records (e.g. missing files).
+    Returns a list of group dicts: 'records' (the similar records), 'match_type'
+    (FILENAME+DATE, EXACT or SIMILAR), 'size' (file size of the first record) and
+    'transcripts' (the stripped transcript of each record).
     """
-    # First pass: Group by (original_filename + date)
-    filename_date_groups = defaultdict(list)
-    
+    # Column arrays built in one pass; every later step works on indices into them,
+    # so each size lookup and transcript strip happens exactly once per record
+    ids = []
+    sizes = []
+    transcripts = []
     for record in records:
-        rec_id, orig_name, stored_name, transcript, status, source_path = record
-        file_size = get_file_size(stored_name)
-        
-        if file_size is None:
-            continue  # Skip missing files
-        
-        # Group by (original_filename, date) - ignore macOS metadata files
-        if orig_name and not orig_name.startswith('._'):
-            date = extract_date_from_stored_filename(stored_name)
-            # Use tuple of (original_filename, date) as key
-            key = (orig_name.upper(), date)
-            filename_date_groups[key].append(record)
-    
-    # Separate filename+date duplicates from unique records
-    duplicate_groups = []
-    remaining_records = []
-    
-    for (filename, date), recs in filename_date_groups.items():
-        if len(recs) > 1:
-            duplicate_groups.append(recs)
-            console.log(f"Found {len(recs)} duplicates with filename={filename}, date={date}")
-        else:
-            remaining_records.append(recs[0])
+        ids.append(record[0])
+        sizes.append(get_file_size(record[2]))
+        transcripts.append(record[3].strip() if record[3] else "")
+    index_by_id = {rec_id: i for i, rec_id in enumerate(ids)}
+    
+    # First pass: (original_filename + date) groups, already found by SQLite
+    grouped_ids = set()
+    index_groups = []
+    remaining = []
+    
+    for filename, date, group_ids in filename_date_groups:
+        grouped_ids.update(group_ids)
+        indices = [index_by_id[rec_id] for rec_id in sorted(group_ids) if rec_id in index_by_id]
+        if len(indices) > 1:
+            if date is not None:
+                match_type = "FILENAME+DATE"
+            elif all(sizes[i] == sizes[indices[0]] and transcripts[i] == transcripts[indices[0]] for i in indices):
+                match_type = "EXACT"  # stored names without a date were grouped on filename alone
+            else:
+                match_type = "SIMILAR"
+            index_groups.append((indices, match_type))
+            console.log(f"Found {len(indices)} duplicates with filename={filename}, date={date}")
+        elif indices:
+            remaining.append(indices[0])
+    
+    # Every other record has a unique (original_filename, date) - ignore macOS metadata files
+    for i, record in enumerate(records):
+        orig_name = record[1]
+        if orig_name and not orig_name.startswith('._') and ids[i] not in grouped_ids:
+            remaining.append(i)
     
-    console.log(f"Found {len(duplicate_groups)} filename+date-based duplicate groups")
-    console.log(f"Remaining records to check for exact/similarity matching: {len(remaining_records)}")
+    # Keep the record order stable (by ID) for the passes and the report below
+    index_groups.sort(key=lambda group: ids[group[0][0]])
+    remaining.sort(key=ids.__getitem__)
+    
+    console.log(f"Found {len(index_groups)} filename+date-based duplicate groups")
+    console.log(f"Remaining records to check for exact/similarity matching: {len(remaining)}")
     
     # Second pass: exact matches on remaining records
     exact_groups = defaultdict(list)
-    similarity_candidates = []
+    for i in remaining:
+        if transcripts[i]:
+            exact_groups[(sizes[i], transcripts[i])].append(i)
     
-    for record in remaining_records:
-        rec_id, orig_name, stored_name, transcript, status, source_path = record
-        file_size = get_file_size(stored_name)
-        transcript_clean = transcript.strip() if transcript else ""
-        
-        if not transcript_clean:
-            continue
-        
-        signature = (file_size, transcript_clean)
-        exact_groups[signature].append(record)
-    
-    # Add exact duplicates to duplicate_groups
-    for sig, recs in exact_groups.items():
-        if len(recs) > 1:
-            duplicate_groups.append(recs)
+    # Add exact duplicates to the groups
+    similarity_candidates = []
+    for indices in exact_groups.values():
+        if len(indices) > 1:
+            index_groups.append((indices, "EXACT"))
         else:
-            similarity_candidates.append(recs[0])
+            similarity_candidates.append(indices[0])
     
-    console.log(f"After exact matching: {len(duplicate_groups)} total groups, {len(similarity_candidates)} candidates for similarity")
+    console.log(f"After exact matching: {len(index_groups)} total groups, {len(similarity_candidates)} candidates for similarity")
     
     # Third pass: similarity matching on remaining candidates
-    used_indices = set()
-    
-    for i in track(range(len(similarity_candidates)), description="Finding similar duplicates..."):
-        if i in used_indices:
-            continue
-        
-        rec1 = similarity_candidates[i]
-        _, _, stored_name1, transcript1, _, _ = rec1
-        size1 = get_file_size(stored_name1)
-        transcript1_clean = transcript1.strip() if transcript1 else ""
-        
-        if not transcript1_clean:
-            continue
-        
-        similar_group = [rec1]
-        used_indices.add(i)
-        
-        for j in range(i + 1, len(similarity_candidates)):
-            if j in used_indices:
-                continue
-            
-            rec2 = similarity_candidates[j]
-            _, _, stored_name2, transcript2, _, _ = rec2
-            size2 = get_file_size(stored_name2)
-            transcript2_clean = transcript2.strip() if transcript2 else ""
+    # A pair can only match when the file sizes are within FILE_SIZE_TOLERANCE, so sort by
+    # size and compare each candidate only with the following files that are still in range.
+    by_size = sorted(similarity_candidates, key=sizes.__getitem__)
+    
+    # Edge discovery: score the pairs inside each size window. ratio() can never exceed
+    # 2*min(len)/(len1+len2), so that bound is checked first, as plain arithmetic on
+    # precomputed lengths; most pairs are rejected without a function call or a SequenceMatcher.
+    threshold = TRANSCRIPT_SIMILARITY_THRESHOLD
+    lengths = [len(transcript) for transcript in transcripts]
+    similar_pairs = []
+    for pos in track(range(len(by_size)), description="Finding similar duplicates..."):
+        i = by_size[pos]
+        size_i, len_i = sizes[i], lengths[i]
+        for j in by_size[pos + 1:]:
+            if not file_size_similar(size_i, sizes[j]):
+                break  # every later file is larger still
             
-            if not transcript2_clean:
+            len_j = lengths[j]
+            if 2.0 * min(len_i, len_j) / (len_i + len_j) < threshold:
                 continue
             
-            # Check if similar
-            if file_size_similar(size1, size2) and \
-               text_similarity(transcript1_clean, transcript2_clean) >= TRANSCRIPT_SIMILARITY_THRESHOLD:
-                similar_group.append(rec2)
-                used_indices.add(j)
-        
-        if len(similar_group) > 1:
-            duplicate_groups.append(similar_group)
-    
+            # ratio() is not symmetric (autojunk only looks at the second text), so score
+            # each pair in record (ID) order, as the report does
+            a, b = (i, j) if i < j else (j, i)
+            if texts_similar(transcripts[a], transcripts[b], threshold):
+                similar_pairs.append((a, b))
+    
+    # Union phase: disjoint sets with path halving and union by rank
+    parent = list(range(len(records)))
+    rank = [0] * len(records)
+    
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+    
+    for i, j in similar_pairs:
+        root_i, root_j = find(i), find(j)
+        if root_i == root_j:
+            continue
+        if rank[root_i] < rank[root_j]:
+            root_i, root_j = root_j, root_i
+        parent[root_j] = root_i
+        if rank[root_i] == rank[root_j]:
+            rank[root_i] += 1
+    
+    similar_groups = defaultdict(list)
+    for i in similarity_candidates:
+        similar_groups[find(i)].append(i)
+    
+    for indices in similar_groups.values():
+        if len(indices) > 1:
+            index_groups.append((indices, "SIMILAR"))
+    
+    duplicate_groups = [
+        {
+            'records': [records[i] for i in indices],
+            'match_type': match_type,
+            'size': sizes[indices[0]],
+            'transcripts': [transcripts[i] for i in indices],
+        }
+        for indices, match_type in index_groups
+    ]
     console.log(f"Found {len(duplicate_groups)} total duplicate groups (filename+date + exact + similar)")
     
     return duplicate_groups
 
 
+def ensure_filename_index(conn):
+    """
+    Create the covering index that Recording declares for the filename+date query.
+    init_db() only adds it to new databases, so older ones get it here.
+    """
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_recordings_origname_stored
+        ON recordings(original_filename, stored_filename)
+    """)
+
+
 def analyze_database(conn):
     """Analyze database for duplicates and trash."""
     cursor = conn.cursor()
+    load_size_index()
     
-    # Get all recordings
+    # Get all recordings without their transcripts. Those are loaded below for the records
+    # whose file exists, which skips the transcripts of missing files (nothing reads them).
     cursor.execute("""
-        SELECT id, original_filename, stored_filename, transcript, status, source_path
+        SELECT id, original_filename, stored_filename, status, source_path
         FROM recordings
         ORDER BY id
     """)
     
-    all_records = cursor.fetchall()
-    console.log(f"Total records in database: {len(all_records)}")
+    rows = cursor.fetchall()
+    total_records = len(rows)
+    console.log(f"Total records in database: {total_records}")
     
     # Find missing files
     missing_files = []
-    valid_records = []
+    valid_rows = []
     
-    for record in all_records:
-        rec_id, orig_name, stored_name, transcript, status, source_path = record
-        file_size = get_file_size(stored_name)
-        
-        if file_size is None:
-            missing_files.append(record)
+    for row in rows:
+        if get_file_size(row[2]) is None:
+            rec_id, orig_name, stored_name, status, source_path = row
+            missing_files.append((rec_id, orig_name, stored_name, None, status, source_path))
         else:
-            valid_records.append(record)
+            valid_rows.append(row)
+    
+    transcripts = fetch_transcripts(conn, [row[0] for row in valid_rows])
+    valid_records = [
+        (rec_id, orig_name, stored_name, transcripts.get(rec_id), status, source_path)
+        for rec_id, orig_name, stored_name, status, source_path in valid_rows
+    ]
     
     console.log(f"Valid records (files exist): {len(valid_records)}")
     console.log(f"Missing files: {len(missing_files)}")
     
     # Find duplicate groups
-    duplicate_groups = find_duplicate_groups(valid_records)
+    duplicate_groups = find_duplicate_groups(valid_records, fetch_filename_date_groups(conn))
     
     return {
-        'all_records': all_records,
+        'total_records': total_records,
         'duplicate_groups': duplicate_groups,
         'missing_files': missing_files,
     }
@@ -226,8 +346,8 @@ def display_analysis(analysis):
     """Display analysis results."""
     console.print("\n[bold cyan]Database Analysis Results[/bold cyan]\n")
     
-    total_records = len(analysis['all_records'])
-    duplicate_count = sum(len(group) - 1 for group in analysis['duplicate_groups'])
+    total_records = analysis['total_records']
+    duplicate_count = sum(len(group['records']) - 1 for group in analysis['duplicate_groups'])
     unique_count = total_records - duplicate_count - len(analysis['missing_files'])
     
     console.print(f"Total records: [yellow]{total_records}[/yellow]")
@@ -247,53 +367,23 @@ def display_analysis(analysis):
     if analysis['duplicate_groups']:
         console.print(f"\n[bold]Duplicate Groups (showing first 10 of {len(analysis['duplicate_groups'])}):[/bold]")
         for i, group in enumerate(analysis['duplicate_groups'][:10]):
-            # Calculate similarity info
-            rec0 = group[0]
-            _, orig_name0, stored_name0, transcript0, _, _ = rec0
-            size0 = get_file_size(stored_name0)
-            transcript0_clean = transcript0.strip() if transcript0 else ""
-            
-            # Check match type
-            # 1. Check if all have same original filename AND date
-            date0 = extract_date_from_stored_filename(stored_name0)
-            all_same_filename_date = all(
-                rec[1] and rec[1].upper() == orig_name0.upper() and
-                extract_date_from_stored_filename(rec[2]) == date0
-                for rec in group
-            ) if orig_name0 and date0 else False
-            
-            # 2. Check if exact match (same size and transcript)
-            is_exact = all(
-                get_file_size(rec[2]) == size0 and 
-                (rec[3].strip() if rec[3] else "") == transcript0_clean
-                for rec in group
-            )
-            
-            if all_same_filename_date:
-                match_type = "FILENAME+DATE"
-            elif is_exact:
-                match_type = "EXACT"
-            else:
-                match_type = "SIMILAR"
-            
+            transcript0_clean = group['transcripts'][0]
             transcript_preview = transcript0_clean[:50] + "..." if len(transcript0_clean) > 50 else transcript0_clean
             
-            table = Table(title=f"Group {i+1} [{match_type}]: Size≈{size0} bytes, '{transcript_preview}'")
+            table = Table(title=f"Group {i+1} [{group['match_type']}]: Size≈{group['size']} bytes, '{transcript_preview}'")
             table.add_column("ID", style="cyan")
             table.add_column("Original Filename", style="yellow")
             table.add_column("Status", style="magenta")
             table.add_column("Similarity", style="white")
             table.add_column("Keep?", style="bold green")
             
-            for j, rec in enumerate(group):
-                rec_id, orig_name, stored_name, transcript, status, _ = rec
+            for j, (rec, transcript_j) in enumerate(zip(group['records'], group['transcripts'])):
+                rec_id, orig_name, _, _, status, _ = rec
                 
                 # Calculate similarity to first record
                 if j == 0:
                     similarity = "100%"
                 else:
-                    size_j = get_file_size(stored_name)
-                    transcript_j = transcript.strip() if transcript else ""
                     sim = text_similarity(transcript0_clean, transcript_j)
                     similarity = f"{sim*100:.1f}%"
                 
@@ -330,7 +420,7 @@ def cleanup_database(conn, analysis, dry_run=True):
     for group in analysis['duplicate_groups']:
         # Keep the first record (lowest ID or EXPORTED status preferred)
         # Sort by: EXPORTED status first, then by ID
-        sorted_group = sorted(group, key=lambda r: (r[4] != 'EXPORTED', r[0]))
+        sorted_group = sorted(group['records'], key=lambda r: (r[4] != 'EXPORTED', r[0]))
         
         # Delete all except the first one
         for rec in sorted_group[1:]:
@@ -340,9 +430,11 @@ def cleanup_database(conn, analysis, dry_run=True):
     
     if not dry_run:
         if ids_to_delete:
-            placeholders = ','.join('?' * len(ids_to_delete))
-            cursor.execute(f"DELETE FROM recordings WHERE id IN ({placeholders})", ids_to_delete)
-            conn.commit()
+            # One transaction for all batches; commits on success, rolls back on error
+            with conn:
+                for chunk in _chunks(ids_to_delete, ID_BATCH_SIZE):
+                    placeholders = ','.join('?' * len(chunk))
+                    cursor.execute(f"DELETE FROM recordings WHERE id IN ({placeholders})", chunk)
             console.print(f"[green]✓ Deleted {len(ids_to_delete)} records[/green]")
         else:
             console.print("[yellow]No records to delete[/yellow]")
@@ -375,9 +467,13 @@ def main():
         console.print(f"[red]Error: Database not found at {DB_PATH}[/red]")
         sys.exit(1)
     
-    conn = sqlite3.connect(DB_PATH)
+    conn = open_db(DB_PATH)
     
     try:
+        # Only a real cleanup may change the schema; a dry run leaves the database as it is
+        if args.force:
+            ensure_filename_index(conn)
+        
         # Analyze
         analysis = analyze_database(conn)
         display_analysis(analysis)
@@ -1,19 +1,15 @@
 import sys
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
 from pathlib import Path
 
 # Add project root to path
 sys.path.append(str(Path(__file__).resolve().parent.parent))
 
-from microfoon.database import Recording
-from microfoon.config import DATABASE_URL, STORAGE_DIRECTORY, OBSIDIAN_VAULT_PATH
+from microfoon.database import SessionLocal, Recording
+from microfoon.config import STORAGE_DIRECTORY, OBSIDIAN_VAULT_PATH
 
 def repair_db():
-    engine = create_engine(DATABASE_URL)
-    Session = sessionmaker(bind=engine)
-    session = Session()
+    session = SessionLocal()
 
     recordings = session.query(Recording).all()
     
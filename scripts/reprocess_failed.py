@@ -5,6 +5,7 @@ Attempts to use compressed MP3 files if original WAV files are missing.
 """
 
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from rich.console import Console
 from rich.table import Table
@@ -15,14 +16,19 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from microfoon.database import get_db, Recording, ProcessingStatus
 from microfoon.intelligence import GeminiProcessor
 from microfoon.exporter import ObsidianExporter
-from microfoon.config import STORAGE_DIRECTORY
+from microfoon.audio import list_stored_files
+from microfoon.config import STORAGE_DIRECTORY, GEMINI_CONCURRENCY, GEMINI_REQUESTS_PER_MINUTE
 
 console = Console()
 
+# Status updates are committed once per this many recordings, not one by one
+COMMIT_BATCH_SIZE = 20
+
 def reprocess_failed_recordings():
     """Find and reprocess all failed recordings."""
     db_session = next(get_db())
-    processor = GeminiProcessor()
+    # Most of these recordings failed on quota errors, so request starts are spaced out
+    processor = GeminiProcessor(requests_per_minute=GEMINI_REQUESTS_PER_MINUTE)
     exporter = ObsidianExporter()
     
     # Query all failed recordings
@@ -53,6 +59,13 @@ def reprocess_failed_recordings():
     # Process each failed recording
     success_count = 0
     still_failed_count = 0
+    pending_commits = 0
+    
+    # Failed recordings whose audio is still on disk, with the file to send
+    to_process = []
+    
+    # Files in the storage directory, listed once instead of two stats per recording
+    stored_files = list_stored_files(STORAGE_DIRECTORY)
     
     for recording in failed_recordings:
         console.print(f"\n[bold blue]Reprocessing ID {recording.id}:[/bold blue] {recording.original_filename}")
@@ -61,9 +74,9 @@ def reprocess_failed_recordings():
         stored_path = STORAGE_DIRECTORY / recording.stored_filename
         
         # If WAV doesn't exist, try compressed MP3
-        if not stored_path.exists():
+        if recording.stored_filename not in stored_files:
             mp3_path = stored_path.with_suffix('.compressed.mp3')
-            if mp3_path.exists():
+            if mp3_path.name in stored_files:
                 console.print(f"[yellow]WAV not found, using compressed MP3: {mp3_path.name}[/yellow]")
                 stored_path = mp3_path
                 # Update the database to reflect the actual file
@@ -71,50 +84,73 @@ def reprocess_failed_recordings():
             else:
                 console.print(f"[bold red]File not found: {stored_path} or {mp3_path}[/bold red]")
                 recording.error_message = f"File not found: {stored_path.name}"
-                db_session.commit()
                 still_failed_count += 1
                 continue
         
         # Reset status to processing
         recording.status = ProcessingStatus.PROCESSING
         recording.error_message = None
-        db_session.commit()
         
-        # Try to process with Gemini
+        to_process.append((recording, stored_path))
+    
+    # Gemini calls run in worker threads; the session and the exports stay on this thread
+    with ThreadPoolExecutor(max_workers=GEMINI_CONCURRENCY) as pool:
+        jobs = {
+            pool.submit(processor.process_audio, stored_path, retry=True, use_cache=False): recording
+            for recording, stored_path in to_process
+        }
         try:
-            result = processor.process_audio(stored_path, retry=True)
-            
-            if result:
-                recording.transcript = result.get("transcript")
-                recording.summary = result.get("cleanup")
-                recording.title = result.get("title")
-                recording.status = ProcessingStatus.COMPLETED
+            for future in as_completed(jobs):
+                recording = jobs[future]
+                console.print(f"\n[bold blue]Result for ID {recording.id}:[/bold blue] {recording.original_filename}")
                 
-                console.print(f"[bold green]✓ Success![/bold green]")
-                console.print(f"[bold]Title:[/bold] {recording.title}")
-                console.print(f"[bold]Summary:[/bold] {recording.summary[:100]}...")
+                # Collect the Gemini result
+                try:
+                    result = future.result()
+                    
+                    if result:
+                        recording.transcript = result.transcript
+                        recording.summary = result.cleanup
+                        recording.title = result.title
+                        recording.status = ProcessingStatus.COMPLETED
+                        
+                        console.print(f"[bold green]✓ Success![/bold green]")
+                        console.print(f"[bold]Title:[/bold] {recording.title}")
+                        console.print(f"[bold]Summary:[/bold] {recording.summary[:100]}...")
+                        
+                        # Export to Obsidian
+                        obsidian_path = exporter.export(recording)
+                        if obsidian_path:
+                            recording.obsidian_path = str(obsidian_path)
+                            recording.status = ProcessingStatus.EXPORTED
+                            console.print(f"[bold green]✓ Exported to Obsidian[/bold green]")
+                        
+                        success_count += 1
+                    else:
+                        recording.status = ProcessingStatus.FAILED
+                        recording.error_message = "Gemini processing returned no result (after retry)"
+                        console.print(f"[bold red]✗ Still failed after retry[/bold red]")
+                        still_failed_count += 1
                 
-                # Export to Obsidian
-                obsidian_path = exporter.export(recording)
-                if obsidian_path:
-                    recording.obsidian_path = str(obsidian_path)
-                    recording.status = ProcessingStatus.EXPORTED
-                    console.print(f"[bold green]✓ Exported to Obsidian[/bold green]")
+                except Exception as e:
+                    console.print(f"[bold red]✗ Error:[/bold red] {e}")
+                    recording.status = ProcessingStatus.FAILED
+                    recording.error_message = str(e)
+                    still_failed_count += 1
                 
-                success_count += 1
-            else:
-                recording.status = ProcessingStatus.FAILED
-                recording.error_message = "Gemini processing returned no result (after retry)"
-                console.print(f"[bold red]✗ Still failed after retry[/bold red]")
-                still_failed_count += 1
-        
-        except Exception as e:
-            console.print(f"[bold red]✗ Error:[/bold red] {e}")
-            recording.status = ProcessingStatus.FAILED
-            recording.error_message = str(e)
-            still_failed_count += 1
-        
-        db_session.commit()
+                pending_commits += 1
+                if pending_commits >= COMMIT_BATCH_SIZE:
+                    db_session.commit()
+                    pending_commits = 0
+
+        except BaseException:
+            # Don't start the queued Gemini calls when the run is aborted
+            pool.shutdown(cancel_futures=True)
+            raise
+        finally:
+            # Flush the last partial batch (and any file-not-found updates), also
+            # when the run is aborted, so finished Gemini results are not lost
+            db_session.commit()
     
     # Summary
     console.print("\n" + "="*60)
@@ -1,29 +1,32 @@
 import sys
 import os
 import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
 from rich.console import Console
 from rich.prompt import Confirm
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
 
 # Add project root to path
 sys.path.append(str(Path(__file__).resolve().parent.parent))
 
-from microfoon.database import Recording, ProcessingStatus, Base
-from microfoon.config import DATABASE_URL, STORAGE_DIRECTORY
+from microfoon.database import SessionLocal, Recording, ProcessingStatus
+from microfoon.config import STORAGE_DIRECTORY, GEMINI_CONCURRENCY, GEMINI_REQUESTS_PER_MINUTE
 from microfoon.intelligence import GeminiProcessor
 from microfoon.exporter import ObsidianExporter
+from microfoon.audio import list_stored_files
 
 console = Console()
 
-def regenerate(recording_id=None, original_filename=None, auto_confirm=False, export_only=False):
-    engine = create_engine(DATABASE_URL)
-    Session = sessionmaker(bind=engine)
-    session = Session()
+# Regenerated recordings are written to the database in batches of this size
+COMMIT_BATCH_SIZE = 20
 
-    processor = GeminiProcessor()
+def regenerate(recording_id=None, original_filename=None, auto_confirm=False, export_only=False, use_cache=True):
+    # SessionLocal's engine applies the WAL/synchronous pragmas from microfoon.database
+    session = SessionLocal()
+
+    # Request starts are spaced out to stay within GEMINI_REQUESTS_PER_MINUTE; cache hits don't wait
+    processor = GeminiProcessor(requests_per_minute=GEMINI_REQUESTS_PER_MINUTE)
     exporter = ObsidianExporter()
 
     query = session.query(Recording)
@@ -42,6 +45,11 @@ def regenerate(recording_id=None, original_filename=None, auto_confirm=False, ex
     if not auto_confirm and not Confirm.ask("Do you want to proceed? This will overwrite existing Obsidian notes."):
         return
 
+    # Which stored files exist, from a single listing of the storage directory
+    stored_files = list_stored_files(STORAGE_DIRECTORY)
+    # (recording, audio path) pairs that go to Gemini once the export-only work is done
+    to_process = []
+    pending_commits = 0
     for rec in recordings:
         # Check if already in new format (starts with bold or paren topic)
         # For now, we comment this out because we WANT to re-process files that might have bad content (English instead of Dutch, or bad dialogue)
@@ -58,10 +66,10 @@ def regenerate(recording_id=None, original_filename=None, auto_confirm=False, ex
         
         file_path = STORAGE_DIRECTORY / rec.stored_filename
         
-        if not file_path.exists():
+        if rec.stored_filename not in stored_files:
              # Try to find compressed version
              compressed_path = file_path.with_suffix(".compressed.mp3")
-             if compressed_path.exists():
+             if compressed_path.name in stored_files:
                  file_path = compressed_path
              else:
                  console.print(f"[red]Audio file not found for {rec.original_filename}. Skipping.[/red]")
@@ -74,54 +82,76 @@ def regenerate(recording_id=None, original_filename=None, auto_confirm=False, ex
                     rec.obsidian_path = str(exported_path)
                     rec.status = ProcessingStatus.EXPORTED
                     rec.reprocessed_at = datetime.now()
-                    session.commit()
+                    pending_commits += 1
                     console.print(f"[green]Re-exported:[/green] {exported_path}")
                 else:
                     console.print(f"[red]Export failed for {rec.original_filename}[/red]")
             except Exception as e:
                 console.print(f"[red]Error exporting {rec.original_filename}: {e}[/red]")
+            if pending_commits >= COMMIT_BATCH_SIZE:
+                session.commit()
+                pending_commits = 0
             continue
 
-        try:
-            # Use existing transcript if available, otherwise fallback to audio re-transcription
-            result = None
+        # Use existing transcript if available, otherwise fallback to audio re-transcription
+        if rec.transcript:
+            console.print("[dim]Using existing transcript for reprocessing...[/dim]")
+        else:
+            console.print("[dim]No transcript found. Falling back to audio processing...[/dim]")
+        to_process.append((rec, file_path))
+
+    # Up to GEMINI_CONCURRENCY recordings are reprocessed at once. Results are applied
+    # here, on this thread, as they arrive, so every line below names its recording.
+    with ThreadPoolExecutor(max_workers=GEMINI_CONCURRENCY) as pool:
+        jobs = {}
+        for rec, file_path in to_process:
             if rec.transcript:
-                console.print("[dim]Using existing transcript for reprocessing...[/dim]")
-                result = processor.process_transcript(rec.transcript)
+                future = pool.submit(processor.process_transcript, rec.transcript)
             else:
-                console.print("[dim]No transcript found. Falling back to audio processing...[/dim]")
-                result = processor.process_audio(file_path)
-
-            if result:
-                # Update summary and title, but KEEP original transcript if we used process_transcript
-                rec.summary = result.get("cleanup")
-                rec.title = result.get("title")
-                
-                # If we did a full audio process, we also update the transcript
-                if not rec.transcript:
-                    rec.transcript = result.get("transcript")
-                
-                rec.reprocessed_at = datetime.now()
-
-                # Re-export
+                future = pool.submit(processor.process_audio, file_path, use_cache=use_cache)
+            jobs[future] = rec
+        try:
+            for future in as_completed(jobs):
+                rec = jobs[future]
                 try:
-                    exporter.export(rec)
-                    console.print(f"[green]New Title:[/green] {rec.title}")
-                except Exception as e:
-                    console.print(f"[red]Export failed:[/red] {e}")
+                    result = future.result()
+
+                    if result:
+                        # Update summary and title, but KEEP original transcript if we used process_transcript
+                        rec.summary = result.cleanup
+                        rec.title = result.title
+                        
+                        # If we did a full audio process, we also update the transcript
+                        if not rec.transcript:
+                            rec.transcript = result.transcript
+                        
+                        rec.reprocessed_at = datetime.now()
+
+                        # Re-export
+                        try:
+                            exporter.export(rec)
+                            console.print(f"[green]New Title for {rec.original_filename}:[/green] {rec.title}")
+                        except Exception as e:
+                            console.print(f"[red]Export failed for {rec.original_filename}:[/red] {e}")
+
+                        pending_commits += 1
+                    else:
+                        console.print(f"[red]Gemini returned no result for {rec.original_filename}[/red]")
 
-                session.commit()
-            else:
-                console.print(f"[red]Gemini returned no result for {rec.original_filename}[/red]")
+                except Exception as e:
+                    console.print(f"[red]Error processing {rec.original_filename}: {e}[/red]")
 
-        except Exception as e:
-            console.print(f"[red]Error processing {rec.original_filename}: {e}[/red]")
-            
-        # Add a delay to avoid hitting Gemini rate limits (e.g. 15 RPM)
-        if not export_only:
-            console.print("[dim]Waiting 3 seconds before next file...[/dim]")
-            import time
-            time.sleep(3)
+                if pending_commits >= COMMIT_BATCH_SIZE:
+                    session.commit()
+                    pending_commits = 0
+        except BaseException:
+            # Don't start the queued Gemini calls when the run is aborted
+            pool.shutdown(cancel_futures=True)
+            raise
+        finally:
+            # Flush the last partial batch also when the run is aborted,
+            # so finished Gemini results are not lost
+            session.commit()
 
     console.print("[bold green]Regeneration Complete![/bold green]")
 
@@ -150,6 +180,11 @@ def parse_args():
         action="store_true",
         help="Skip Gemini reprocessing and only re-export existing DB content to Obsidian."
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore cached Gemini results for audio files and request fresh ones."
+    )
     return parser.parse_args()
 
 if __name__ == "__main__":
@@ -159,4 +194,5 @@ if __name__ == "__main__":
         original_filename=args.original_filename,
         auto_confirm=args.yes,
         export_only=args.export_only,
+        use_cache=not args.no_cache,
     )
@@ -1,24 +1,27 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from microfoon.database import Recording, Base
-from microfoon.config import DATABASE_URL
+from sqlalchemy import func, or_
+from microfoon.database import SessionLocal, Recording
 
-engine = create_engine(DATABASE_URL)
-Session = sessionmaker(bind=engine)
-session = Session()
+session = SessionLocal()
 
 # Check the last updated recordings
 # We don't have an 'updated_at' field in the model shown earlier, but we can check the content of the summary field
 # to see if it starts with the new bold topic format like "**("
 
-recordings = session.query(Recording).all()
-updated_count = 0
-total_count = len(recordings)
+# Every character str.strip() removes (str.isspace()); SQLite's trim() only strips spaces by default
+WHITESPACE = (
+    "\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f \x85\xa0\u1680"
+    "\u2000\u2001\u2002\u2003\u2004\u2005\u2006\u2007\u2008\u2009\u200a"
+    "\u2028\u2029\u202f\u205f\u3000"
+)
 
-for rec in recordings:
-    # Check for the new format: "**(Topic)**" or "(Topic)"
-    if rec.summary and (rec.summary.strip().startswith("**(") or rec.summary.strip().startswith("(")):
-        updated_count += 1
+# Count in SQLite instead of loading every row
+summary_start = func.ltrim(Recording.summary, WHITESPACE)
+
+total_count = session.query(func.count(Recording.id)).scalar()
+# Check for the new format: "**(Topic)**" or "(Topic)"
+updated_count = session.query(func.count(Recording.id)).filter(
+    or_(summary_start.like("**(%"), summary_start.like("(%"))
+).scalar()
 
 print(f"Total Recordings: {total_count}")
 print(f"Updated Recordings (estimated): {updated_count}")
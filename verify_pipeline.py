@@ -53,7 +53,7 @@ def verify():
     
     # Verify processing (copy/rename)
     from microfoon.audio import copy_and_rename
-    stored_path = copy_and_rename(files[0])
+    stored_path = copy_and_rename(files[0][0])
     assert stored_path.exists()
     assert stored_path.parent == STORAGE_DIRECTORY
     console.log("[green]Copy and Rename passed.[/green]")